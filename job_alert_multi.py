@@ -1,11 +1,25 @@
 import os
+import sys
+import json
+import pickle
+import math
+import time
+import queue
+import sqlite3
+import hashlib
 import smtplib
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from email.message import EmailMessage
 from datetime import datetime, timezone
+from pathlib import Path
 
-import pandas as pd
-from jobspy import scrape_jobs
+# pandas, numpy and jobspy are bound by load_dependencies() on first use,
+# so runs that abort on missing configuration never pay their import cost.
+np = None
+pd = None
+scrape_jobs = None
 
 # ---------------- LOGGING --------------
 logging.basicConfig(
@@ -24,23 +38,39 @@ SEARCH_TERMS = [
 ]
 
 SITES = ["linkedin", "indeed", "google"]
+SOURCES = ["Workday", "Indeed", "LinkedIn", "Google Jobs"]
 LOCATION = "United States"
 REMOTE_ONLY = False
 HOURS_OLD = 48
 RESULTS_WANTED = 200
-
-ALLOWED_TITLE_PATTERNS = [
-    r"performance test engineer",
-    r"performance engineer",
-    r"sr\.?\s*performance test engineer",
-    r"senior performance test engineer",
-    r"performance architect",
-    r"lead\s*-?\s*performance test engineer",
-    r"lead performance test engineer",
-    r"performance test lead",
-    r"performance.*engineer",
-    r".*performance.*"
-]
+MAX_WORKERS = 8
+# Concurrent scrapes allowed per site (sites not listed get 1). LinkedIn's
+# guest API already has jobspy pacing pages 3-7 s apart per session, and
+# parallel sessions from one IP get 429s that jobspy turns into short results.
+SITE_WORKERS = {"linkedin": 1, "indeed": 2, "google": 2}
+DATE_COLUMNS = ["date_posted", "posted_date", "posted_at"]
+# jobspy returns ~30 columns; everything else is dropped right after scraping
+KEEP_COLUMNS = ["title", "company", "job_url", "is_remote"] + DATE_COLUMNS
+
+# Scrape cache (skips re-scraping on quick reruns / retries)
+CACHE_DIR = Path(os.getenv("JOB_ALERT_CACHE_DIR", Path.home() / ".cache" / "job_alert"))
+CACHE_TTL = int(os.getenv("JOB_ALERT_CACHE_TTL", "3600"))  # seconds, 0 disables
+# Older entries are still served when a live scrape fails (e.g. HTTP 429)
+CACHE_STALE_TTL = int(os.getenv("JOB_ALERT_CACHE_STALE_TTL", "86400"))
+
+# Hashes of jobs already emailed, so later runs only report new jobs
+SEEN_DB = CACHE_DIR / "seen.sqlite3"
+SEEN_RETENTION_DAYS = 30
+
+# Adaptive fetch size: ask each (site, term) for just enough rows to yield
+# TARGET_MATCHES after the title filter, based on its last observed hit rate.
+HIT_RATES_PATH = CACHE_DIR / "hit_rates.json"
+TARGET_MATCHES = 50
+MIN_HIT_RATE = 0.05
+
+# Any title containing this keyword (case-insensitive) is in scope. Plain
+# substring search; narrower role patterns would all be subsumed by it.
+TITLE_KEYWORD = "performance"
 
 # Email Secrets
 RECIPIENT = os.getenv("RECIPIENT_EMAIL")
@@ -50,18 +80,248 @@ SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASS = os.getenv("SMTP_PASS")
 
+# Caps concurrent scrapes per site to stay under rate limits
+_site_slots = {
+    site: threading.BoundedSemaphore(SITE_WORKERS.get(site, 1)) for site in SITES
+}
+
+# Title-filter hit rate per "site|term", shared by the scrape threads
+_hit_rates = {}
+_hit_rates_lock = threading.Lock()
+
+# Outgoing mail is handed to a single background sender thread
+_outbox = queue.Queue()
+_send_errors = []
+
 # ---------------------------------------
 
+# Same replacements as html.escape(), applied per column via str.translate
+_HTML_TRANS = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#x27;",
+})
+
+_EMPTY_BODY = """
+        <html><body>
+        <h3>No matching Performance Engineering jobs found in last 48 hours.</h3>
+        </body></html>
+        """
+
+# HTML shells, filled once per render with str.format_map
+_TABLE_TMPL = """
+        <h3>{title} ({count})</h3>
+        <table border="1" cellpadding="6" cellspacing="0">
+            <tr>
+                <th>Posted</th>
+                <th>Source</th>
+                <th>Company</th>
+                <th>Title</th>
+                <th>Link</th>
+            </tr>
+            {rows}
+        </table><br/>
+        """
+
+_EMAIL_TMPL = """
+    <html>
+    <body>
+        <h2>Performance Engineering Job Alerts (Last 48 Hours)</h2>
+        {remote_table}
+        {onsite_table}
+        <p><b>Total jobs:</b> {total}</p>
+    </body>
+    </html>
+    """
+
+
+def load_dependencies():
+    global np, pd, scrape_jobs
+    if scrape_jobs is not None:
+        return
+    import numpy
+    import pandas
+    from jobspy import scrape_jobs as _scrape_jobs
+    np, pd, scrape_jobs = numpy, pandas, _scrape_jobs
+
+
+def compute_posted_ago(posted_dt):
+    """
+    Vectorized "N hours ago" / "N days ago" labels for a UTC datetime Series.
+    Missing dates become "Unknown".
+    """
+    posted = pd.Series("Unknown", index=posted_dt.index, dtype=object)
+    known = posted_dt.notna()
+    if not known.any():
+        return posted
+    hours = (datetime.now(timezone.utc) - posted_dt[known]) // pd.Timedelta(hours=1)
+    hours = hours.astype("int64")
+    posted[known] = np.where(
+        hours < 24,
+        hours.astype(str) + " hours ago",
+        (hours // 24).astype(str) + " days ago"
+    )
+    return posted
+
+
+def cache_path(site, term):
+    key = f"{site}|{term}|{LOCATION}|{HOURS_OLD}"
+    return CACHE_DIR / f"{hashlib.sha1(key.encode()).hexdigest()}.pkl"
+
+
+def load_cached(site, term, wanted, max_age=None, allow_partial=False):
+    """
+    Return up to `wanted` cached rows if the entry is younger than max_age
+    (default CACHE_TTL), else None. An entry fetched with fewer than `wanted`
+    rows is a miss unless allow_partial is set. A corrupt or unreadable
+    cache entry is treated as a miss.
+    """
+    if CACHE_TTL <= 0:
+        return None
+    max_age = CACHE_TTL if max_age is None else max_age
+    path = cache_path(site, term)
+    try:
+        if time.time() - path.stat().st_mtime >= max_age:
+            return None
+        with path.open("rb") as f:
+            entry = pickle.load(f)
+        if entry["requested"] < wanted and not allow_partial:
+            return None
+        return entry["df"].head(wanted)
+    except Exception:
+        return None
+
+
+def store_cached(site, term, wanted, df):
+    if CACHE_TTL <= 0:
+        return
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # jobspy returns a short frame when a site blocks it partway, so
+        # record only what actually arrived; a later run then re-scrapes
+        # instead of treating the cut-off result as a complete hit.
+        with cache_path(site, term).open("wb") as f:
+            pickle.dump({"requested": min(wanted, len(df)), "df": df}, f)
+    except Exception as e:
+        logging.warning(f"Could not cache {site} results for '{term}': {e}")
+
+
+def prune_cache():
+    """
+    Delete scrape cache entries too old to be served even as a stale
+    fallback, so the persisted cache directory stays bounded.
+    """
+    cutoff = time.time() - max(CACHE_TTL, CACHE_STALE_TTL)
+    for path in CACHE_DIR.glob("*.pkl"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass
+
+
+def open_seen_db():
+    """
+    Open the seen-jobs database and purge entries past retention.
+    Returns None if it cannot be opened; the run then emails every job.
+    """
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(SEEN_DB)
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen (h TEXT PRIMARY KEY, first_seen TEXT NOT NULL)"
+            )
+            conn.execute(
+                "DELETE FROM seen WHERE first_seen < datetime('now', ?)",
+                (f"-{SEEN_RETENTION_DAYS} days",)
+            )
+        return conn
+    except Exception as e:
+        logging.warning(f"Could not open seen-jobs database: {e}")
+        return None
+
+
+def job_hashes(df):
+    keys = df.reindex(columns=["title", "company", "job_url"])
+    return pd.util.hash_pandas_object(keys, index=False).astype(str)
+
+
+def drop_seen(df, conn):
+    """
+    Remove jobs emailed by an earlier run, matched on a hash of
+    title + company + job_url.
+    """
+    if conn is None or df.empty:
+        return df
+    hashes = job_hashes(df)
+    try:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS incoming (h TEXT)")
+        conn.execute("DELETE FROM incoming")
+        conn.executemany("INSERT INTO incoming VALUES (?)", ((h,) for h in hashes))
+        known = {h for (h,) in conn.execute("SELECT h FROM incoming JOIN seen USING (h)")}
+    except Exception as e:
+        logging.warning(f"Could not check seen jobs: {e}")
+        return df
+    if known:
+        logging.info(f"Skipping {len(known)} already-emailed jobs")
+        df = df[~hashes.isin(known).to_numpy()].reset_index(drop=True)
+    return df
+
+
+def mark_seen(conn, df):
+    if conn is None or df is None or df.empty:
+        return
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO seen VALUES (?, datetime('now'))",
+                ((h,) for h in job_hashes(df))
+            )
+    except Exception as e:
+        logging.warning(f"Could not record seen jobs: {e}")
+
+
+def load_hit_rates():
+    try:
+        rates = json.loads(HIT_RATES_PATH.read_text())
+    except FileNotFoundError:
+        rates = {}
+    except Exception as e:
+        logging.warning(f"Could not load hit rates: {e}")
+        rates = {}
+    with _hit_rates_lock:
+        _hit_rates.clear()
+        _hit_rates.update(rates)
+
+
+def save_hit_rates():
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with _hit_rates_lock:
+            HIT_RATES_PATH.write_text(json.dumps(_hit_rates, indent=2, sort_keys=True))
+    except Exception as e:
+        logging.warning(f"Could not save hit rates: {e}")
 
-def compute_posted_ago(dt):
-    if pd.isna(dt):
-        return "Unknown"
-    now = datetime.now(timezone.utc)
-    delta = now - dt
-    hours = int(delta.total_seconds() // 3600)
-    if hours < 24:
-        return f"{hours} hours ago"
-    return f"{hours // 24} days ago"
+
+def record_hit_rate(site, term, matched, fetched):
+    if fetched:
+        with _hit_rates_lock:
+            _hit_rates[f"{site}|{term}"] = matched / fetched
+
+
+def results_wanted_for(site, term):
+    """
+    Rows to request so that about TARGET_MATCHES survive the title filter.
+    Unknown pairs get the full RESULTS_WANTED.
+    """
+    with _hit_rates_lock:
+        rate = _hit_rates.get(f"{site}|{term}")
+    if rate is None:
+        return RESULTS_WANTED
+    return min(RESULTS_WANTED, math.ceil(TARGET_MATCHES / max(rate, MIN_HIT_RATE)))
 
 
 def safe_scrape(site, term):
@@ -69,164 +329,345 @@ def safe_scrape(site, term):
     Scrape a single site safely.
     Failure here NEVER crashes the job.
     """
+    wanted = results_wanted_for(site, term)
+    cached = load_cached(site, term, wanted)
+    if cached is not None:
+        logging.info(f"Using cached {site} results for '{term}'")
+        return cached
+
     try:
         logging.info(f"Scraping {site} for '{term}'")
         df = scrape_jobs(
             site_name=[site],
             search_term=term,
             location=LOCATION,
-            results_wanted=RESULTS_WANTED,
+            results_wanted=wanted,
             hours_old=HOURS_OLD
         )
         if df is None or df.empty:
+            # jobspy logs a blocked/429 response and returns nothing rather
+            # than raising, so an empty result gets the stale fallback too
             logging.warning(f"No results from {site} for '{term}'")
-            return pd.DataFrame()
+            return load_stale(site, term, wanted)
+        store_cached(site, term, wanted, df)
         return df
 
     except Exception as e:
         logging.error(f"{site.upper()} failed for '{term}': {e}")
-        return pd.DataFrame()
+        return load_stale(site, term, wanted)
 
 
-def gather_jobs():
-    all_results = []
+def load_stale(site, term, wanted):
+    """
+    Fall back to a cached scrape up to CACHE_STALE_TTL old, even one fetched
+    with fewer rows. Jobs already emailed are removed later by drop_seen.
+    """
+    stale = load_cached(
+        site, term, wanted, max_age=CACHE_STALE_TTL, allow_partial=True
+    )
+    if stale is not None:
+        logging.warning(f"Using stale cached {site} results for '{term}'")
+        return stale
+    return pd.DataFrame()
+
+
+def scrape_pair(site, term):
+    """
+    Scrape one (site, term) pair and title-filter it.
+    Runs inside a worker thread; returns None when the scrape failed.
+    """
+    with _site_slots[site]:
+        df = safe_scrape(site, term)
+    if df.empty:
+        return None
+    matched = filter_titles(df, site)
+    record_hit_rate(site, term, len(matched), len(df))
+    return matched
+
+
+def filter_titles(df, site):
+    """
+    Apply the title filter to one scrape before it is concatenated,
+    so rows that would be dropped anyway never reach the later passes.
+    Only the columns used downstream are kept.
+    """
+    df = df.rename(columns=str.lower)
+    df = df[[c for c in KEEP_COLUMNS if c in df.columns]]
+    if "title" not in df.columns:
+        return df.iloc[0:0].assign(site=site)
+    df = df[df["title"].str.contains(TITLE_KEYWORD, case=False, regex=False, na=False)]
+    return df.assign(site=site)
 
-    for term in SEARCH_TERMS:
-        for site in SITES:
-            df = safe_scrape(site, term)
-            if not df.empty:
-                df["site"] = site
-                all_results.append(df)
+
+def drop_repeats(df, seen_keys):
+    """
+    Drop rows already collected from an earlier scrape in this run.
+    A job is keyed on its URL, or on lower-cased title + company when it
+    has none; seen_keys is updated in place.
+    """
+    def col(name):
+        if name not in df.columns:
+            return pd.Series("", index=df.index)
+        return df[name].astype(object).fillna("").astype(str).str.strip()
+
+    keep = []
+    urls, titles, companies = col("job_url"), col("title").str.lower(), col("company").str.lower()
+    for url, title, company in zip(urls, titles, companies):
+        key = url or (title, company)
+        keep.append(key not in seen_keys)
+        seen_keys.add(key)
+    return df[np.array(keep, dtype=bool)]
+
+
+def gather_jobs():
+    # Import jobspy here, once, before any worker thread needs it
+    load_dependencies()
+    prune_cache()
+    load_hit_rates()
+
+    # Scraping is network-bound, so every (site, term) pair is fetched
+    # concurrently; results are kept in task order so dedup stays stable.
+    tasks = [(site, term) for term in SEARCH_TERMS for site in SITES]
+    results = [None] * len(tasks)
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(tasks))) as ex:
+        futures = {ex.submit(scrape_pair, site, term): i for i, (site, term) in enumerate(tasks)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    # Dedup in task order with one set lookup per row, before concat
+    seen_keys = set()
+    all_results = [drop_repeats(df, seen_keys) for df in results if df is not None]
+
+    save_hit_rates()
 
     if not all_results:
         logging.error("All sources failed. Returning empty DataFrame.")
         return pd.DataFrame()
 
-    df = pd.concat(all_results, ignore_index=True)
-    df.columns = [c.lower() for c in df.columns]
+    # Empty frames only force dtype re-inference in concat, so leave them out
+    frames = [f for f in all_results if not f.empty]
+    if not frames:
+        logging.info("No jobs matched the title filter.")
+        return pd.DataFrame()
+
+    df = pd.concat(frames, ignore_index=True)
 
     # -------- Remote filter --------
     if REMOTE_ONLY and "is_remote" in df.columns:
         df = df[df["is_remote"] == True]
 
-    # -------- Title filter --------
-    title_regex = "|".join(ALLOWED_TITLE_PATTERNS)
-    df = df[df["title"].str.lower().str.contains(title_regex, regex=True, na=False)]
-
     # -------- Source tagging --------
-    def tag_source(url, site):
-        if "workdayjobs" in str(url).lower():
-            return "Workday"
-        if site == "indeed":
-            return "Indeed"
-        if site == "linkedin":
-            return "LinkedIn"
-        return "Google Jobs"
-
-    df["source"] = df.apply(
-        lambda r: tag_source(r.get("job_url"), r.get("site")),
-        axis=1
+    # Few distinct values, so store as categoricals (int8 codes)
+    df["site"] = pd.Categorical(df["site"], categories=SITES)
+    df["source"] = pd.Categorical(
+        np.select(
+            [
+                df["job_url"].astype(str).str.contains("workdayjobs", case=False, regex=False),
+                df["site"].eq("indeed"),
+                df["site"].eq("linkedin"),
+            ],
+            ["Workday", "Indeed", "LinkedIn"],
+            default="Google Jobs"
+        ),
+        categories=SOURCES
     )
 
-    # -------- Deduplicate --------
-    df.drop_duplicates(subset=["title", "company", "job_url"], inplace=True)
-
     # -------- Normalize date --------
-    df["posted_dt"] = pd.NaT
-    for col in ["date_posted", "posted_date", "posted_at"]:
-        if col in df.columns:
-            df["posted_dt"] = pd.to_datetime(df[col], errors="coerce", utc=True)
-            break
+    # Coalesce the candidate columns once, then parse with the ISO8601 fast
+    # path instead of pandas' per-element format inference.
+    date_cols = [c for c in DATE_COLUMNS if c in df.columns]
+    if date_cols:
+        if len(date_cols) == 1:
+            raw = df[date_cols[0]]
+        else:
+            raw = df[date_cols].bfill(axis=1).iloc[:, 0]
+        df["posted_dt"] = pd.to_datetime(
+            raw, errors="coerce", utc=True, format="ISO8601"
+        )
 
-    # -------- Sort newest first --------
-    df.sort_values(by="posted_dt", ascending=False, inplace=True)
+        # -------- Sort newest first --------
+        df.sort_values(by="posted_dt", ascending=False, inplace=True)
 
-    # -------- Human readable time --------
-    df["posted"] = df["posted_dt"].apply(compute_posted_ago)
+        # -------- Human readable time --------
+        df["posted"] = compute_posted_ago(df["posted_dt"])
+    else:
+        df["posted"] = "Unknown"
 
     df.reset_index(drop=True, inplace=True)
     return df
 
 
 def build_html_email(df):
-    if df.empty:
-        return """
-        <html><body>
-        <h3>No matching Performance Engineering jobs found in last 48 hours.</h3>
-        </body></html>
-        """
+    if df is None or df.empty:
+        return _EMPTY_BODY
 
-    remote_df = df[df.get("is_remote") == True]
-    onsite_df = df[df.get("is_remote") != True]
+    load_dependencies()
+
+    # One boolean mask for both halves of the split
+    if "is_remote" in df.columns:
+        remote_mask = (df["is_remote"] == True).fillna(False).to_numpy(dtype=bool)
+    else:
+        remote_mask = np.zeros(len(df), dtype=bool)
+    remote_df = df.iloc[remote_mask]
+    onsite_df = df.iloc[~remote_mask]
 
     def build_table(title, data):
         if data.empty:
             return f"<h3>{title}</h3><p>No jobs found.</p>"
 
-        rows = ""
-        for _, r in data.iterrows():
-            rows += f"""
-            <tr>
-                <td>{r['posted']}</td>
-                <td>{r['source']}</td>
-                <td>{r.get('company','')}</td>
-                <td>{r.get('title','')}</td>
-                <td><a href="{r.get('job_url')}" target="_blank">View Job</a></td>
-            </tr>
-            """
-
-        return f"""
-        <h3>{title} ({len(data)})</h3>
-        <table border="1" cellpadding="6" cellspacing="0">
-            <tr>
-                <th>Posted</th>
-                <th>Source</th>
-                <th>Company</th>
-                <th>Title</th>
-                <th>Link</th>
-            </tr>
-            {rows}
-        </table><br/>
-        """
+        def col(name):
+            if name not in data.columns:
+                return pd.Series("", index=data.index)
+            values = data[name].astype(object).fillna("").astype(str)
+            return values.str.translate(_HTML_TRANS)
+
+        # Build every row in one vectorized pass instead of iterrows()
+        rows = "".join((
+            "<tr><td>" + col("posted")
+            + "</td><td>" + col("source")
+            + "</td><td>" + col("company")
+            + "</td><td>" + col("title")
+            + '</td><td><a href="' + col("job_url")
+            + '" target="_blank">View Job</a></td></tr>\n'
+        ).tolist())
+
+        return _TABLE_TMPL.format_map(
+            {"title": title, "count": len(data), "rows": rows}
+        )
 
-    return f"""
-    <html>
-    <body>
-        <h2>Performance Engineering Job Alerts (Last 48 Hours)</h2>
-        {build_table("🟢 Remote Roles", remote_df)}
-        {build_table("🔵 Onsite / Hybrid Roles", onsite_df)}
-        <p><b>Total jobs:</b> {len(df)}</p>
-    </body>
-    </html>
-    """
+    return _EMAIL_TMPL.format_map({
+        "remote_table": build_table("🟢 Remote Roles", remote_df),
+        "onsite_table": build_table("🔵 Onsite / Hybrid Roles", onsite_df),
+        "total": len(df),
+    })
 
 
-def send_email(html_body, count):
+def build_message(html_body, count):
     msg = EmailMessage()
     msg["Subject"] = f"Performance Engineering Jobs ({count})"
     msg["From"] = SENDER
     msg["To"] = RECIPIENT
     msg.set_content("HTML email required")
     msg.add_alternative(html_body, subtype="html")
+    return msg
+
 
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as s:
+def open_smtp():
+    """
+    Connect, STARTTLS and authenticate once.
+    The returned client can send any number of messages.
+    """
+    s = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
+    try:
         s.starttls()
         s.login(SMTP_USER, SMTP_PASS)
-        s.send_message(msg)
+    except Exception:
+        s.close()
+        raise
+    return s
+
+
+def _smtp_worker():
+    """
+    Own the single SMTP connection and deliver queued messages.
+    The connection is opened on the first message and closed on the
+    None sentinel posted by flush_emails().
+    """
+    client = None
+    try:
+        while True:
+            msg = _outbox.get()
+            try:
+                if msg is None:
+                    return
+                if client is None:
+                    client = open_smtp()
+                client.send_message(msg)
+            except Exception as e:
+                logging.error(f"Failed to send '{msg['Subject']}': {e}")
+                _send_errors.append(e)
+                if client is not None:
+                    client.close()
+                    client = None
+            finally:
+                _outbox.task_done()
+    finally:
+        if client is not None:
+            try:
+                client.quit()
+            except Exception:
+                client.close()
+
+
+def start_mailer():
+    worker = threading.Thread(target=_smtp_worker, name="smtp-worker", daemon=True)
+    worker.start()
+    return worker
+
+
+def send_email(msg):
+    """Queue a message for the mailer thread; returns immediately."""
+    _outbox.put(msg)
+
+
+def flush_emails(worker):
+    """
+    Wait for every queued message, then stop the mailer thread.
+    Raises the first delivery error so the run is marked failed.
+    """
+    _outbox.put(None)
+    worker.join()
+    if _send_errors:
+        raise _send_errors[0]
+
+
+def check_config():
+    """
+    Exit early (status 2) when required email settings are missing,
+    before any heavy import or scrape happens.
+    """
+    required = {
+        "RECIPIENT_EMAIL": RECIPIENT,
+        "SENDER_EMAIL": SENDER,
+        "SMTP_USER": SMTP_USER,
+        "SMTP_PASS": SMTP_PASS,
+    }
+    missing = [name for name, value in required.items() if not value]
+    if missing:
+        logging.critical(f"Missing required settings: {', '.join(missing)}")
+        sys.exit(2)
 
 
 def main():
+    check_config()
+    mailer = start_mailer()
+    seen_db = open_seen_db()
+    emailed = None
     try:
-        df = gather_jobs()
-        send_email(build_html_email(df), len(df))
-        logging.info(f"Email sent with {len(df)} jobs.")
+        found = gather_jobs()
+        df = drop_seen(found, seen_db)
+        if df.empty and not found.empty:
+            # Matches exist but were all in an earlier alert
+            summary = "No new jobs since last alert; email skipped."
+        else:
+            send_email(build_message(build_html_email(df), len(df)))
+            emailed = df
+            summary = f"Email sent with {len(df)} jobs."
     except Exception as e:
         # FINAL safety net — job NEVER fails
         logging.critical(f"Fatal error avoided: {e}")
-        send_email(
+        send_email(build_message(
             "<h3>Job ran but encountered errors. Check logs.</h3>",
             0
-        )
+        ))
+        summary = "Error notification sent."
+
+    flush_emails(mailer)
+    logging.info(summary)
+
+    # Only remember jobs once the email carrying them was delivered
+    mark_seen(seen_db, emailed)
+    if seen_db is not None:
+        seen_db.close()
 
 
 if __name__ == "__main__":